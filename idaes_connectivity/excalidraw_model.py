@@ -15,6 +15,10 @@ can work with Mermaid output with minimal changes).
 
 This is an experimental functionality, not yet ready for
 the general public to try out.
+
+Installing the optional `fast` extra (``pip install idaes-model-conn[fast]``)
+adds lxml, for faster SVG parsing, and orjson, for faster JSON output.
+Without them, the standard library parser and `json` module are used.
 """
 
 from __future__ import annotations
@@ -22,20 +26,210 @@ from __future__ import annotations
 import argparse
 from collections import namedtuple
 from hashlib import sha1
-from io import IOBase
+from io import BufferedIOBase, BytesIO, IOBase, RawIOBase, TextIOBase
 import json
 import logging
-import random
+import os
 import re
 import sys
 import time
-from typing import Any, Dict, List
-import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import numpy as np
 from pydantic import BaseModel
 
+# orjson is optional; it is used to write the output if available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# lxml's C parser is much faster than the pure-Python ElementTree, but it is optional
+try:
+    from lxml import etree as ET
+
+    _HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+    _HAVE_LXML = False
+
 _log = logging.getLogger(__name__)
 
+# Qualified SVG tag names
+_SVG_NS = "{http://www.w3.org/2000/svg}"
+_SVG_TAG = _SVG_NS + "svg"
+_G_TAG = _SVG_NS + "g"
+_RECT_TAG = _SVG_NS + "rect"
+_TEXT_TAG = _SVG_NS + "text"
+_PATH_TAG = _SVG_NS + "path"
+_IMAGE_TAG = _SVG_NS + "image"
+
+# Index of the text and line parts of a top-level group, by tag, and kind
+# of shape for each tag in a (shape) group
+_GROUP_PARTS = {_TEXT_TAG: 0, _PATH_TAG: 1}
+_SHAPE_KINDS = {_RECT_TAG: "rectangle", _IMAGE_TAG: "image"}
+
+# Data read from the SVG groups, before creating the Excalidraw elements.
+# Shape kind is "rectangle", "image", or None for a group with only text.
+TextRecord = namedtuple("TextRecord", "value x y font_size")
+ShapeRecord = namedtuple("ShapeRecord", "id kind x y width height href text")
+EdgeRecord = namedtuple("EdgeRecord", "id start end coords text")
+
+# Patterns for text style and line (edge) identifiers
+_FONT_SIZE_RE = re.compile(r"font-size:\s*(\d+)px")
+_EDGE_ID_RE = re.compile(r"\((\S+)\s*->\s*(\S+)\)")
+
+# Indexes of (x, y) pairs used from the tokens of a cubic path
+# 'M sx sy C c1x c1y c2x c2y ex ey [...]': start, first control point,
+# last point of the path, and end of the first curve.
+_PATH_COORD_INDEXES = (1, 2, 4, 5, -2, -1, 8, 9)
+
+# Templates for the Excalidraw elements, with the values that are the same
+# for every element of a type. Keys set to None here (and all the mutable
+# values, which must not be shared) are filled in for each element.
+_RECT_TEMPLATE = {
+    "id": None,
+    "type": "rectangle",
+    "x": None,
+    "y": None,
+    "width": None,
+    "height": None,
+    "angle": 0,
+    "strokeColor": "#000000",
+    "backgroundColor": "transparent",
+    "fillStyle": "solid",
+    "strokeWidth": 2,
+    "strokeStyle": "solid",
+    "roughness": 1,
+    "opacity": 100,
+    "roundness": None,
+    "isDeleted": False,
+    "updated": None,
+    "locked": False,
+    "points": None,
+    "originalText": None,
+    "autoResize": True,
+    "lineHeight": 1.25,
+    "groupIds": None,
+    "frameId": None,
+    "link": None,
+    "boundElements": None,
+}
+_IMAGE_TEMPLATE = {
+    **_RECT_TEMPLATE,
+    "type": "image",
+    "scale": None,
+    "crop": None,
+    "fileId": None,
+}
+_TEXT_TEMPLATE = {
+    "id": None,
+    "type": "text",
+    "x": None,
+    "y": None,
+    "width": None,
+    "height": None,
+    "angle": 0,
+    "strokeColor": "#000000",
+    "backgroundColor": "transparent",
+    "fillStyle": "solid",
+    "strokeWidth": 2,
+    "strokeStyle": "solid",
+    "roughness": 1,
+    "opacity": 100,
+    "groupIds": None,
+    "frameId": None,
+    "roundness": None,
+    "isDeleted": False,
+    "boundElements": None,
+    "updated": None,
+    "link": None,
+    "locked": False,
+    "text": None,
+    "fontSize": None,
+    "fontFamily": 6,
+    "textAlign": "center",
+    "verticalAlign": "middle",
+    "containerId": None,
+    "originalText": None,
+    "autoResize": True,
+    "lineHeight": 1,
+}
+_ARROW_TEMPLATE = {
+    "id": None,
+    "type": "arrow",
+    "x": None,
+    "y": None,
+    "width": None,
+    "height": None,
+    "angle": 0,
+    "strokeColor": "#1e1e1e",
+    "backgroundColor": "transparent",
+    "fillStyle": "solid",
+    "strokeWidth": 2,
+    "strokeStyle": "solid",
+    "roughness": 1,
+    "opacity": 100,
+    "groupIds": None,
+    "frameId": None,
+    "roundness": None,
+    "isDeleted": False,
+    "boundElements": None,
+    "updated": None,
+    "link": None,
+    "locked": False,
+    "points": None,
+    "lastCommittedPoint": None,
+    "startBinding": None,
+    "endBinding": None,
+    "startArrowhead": None,
+    "endArrowhead": "arrow",
+    "elbowed": False,
+}
+
+
+def _binary_input(infile: IOBase) -> IOBase:
+    """Incremental parsing (with lxml) needs a binary stream, so wrap text input."""
+    if isinstance(infile, TextIOBase):
+        if hasattr(infile, "buffer"):
+            return infile.buffer
+        return BytesIO(infile.read().encode("utf-8"))
+    return infile
+
+
+def _is_binary_output(outfile) -> bool:
+    """Whether `outfile` takes bytes; anything not known to be binary is text."""
+    if isinstance(outfile, (RawIOBase, BufferedIOBase)):
+        return True
+    return "b" in getattr(outfile, "mode", "")
+
+
+def _edge_geom(pts: np.ndarray):
+    """Geometry of lines from their path coordinates.
+
+    Args:
+        pts: (n, 4, 2) array with, for each line, the start, first control
+             point, last point, and end of the first curve
+
+    Returns:
+        Tuple of arrays of start x, start y, width, height, and an (n, 2, 2)
+        array of the control and last points relative to the start
+    """
+    start = pts[:, 0]
+    size = np.abs(pts[:, 3] - start)
+    rel = pts[:, 1:3] - start[:, np.newaxis]
+    return start[:, 0], start[:, 1], size[:, 0], size[:, 1], rel
+
+
+_DEFAULT_APP_STATE = {
+    "gridSize": 20,
+    "gridStep": 5,
+    "gridModeEnabled": False,
+    "viewBackgroundColor": "#ffffff",
+}
+
 
 class AppState(BaseModel):
     gridSize: int
@@ -54,350 +248,476 @@ class Model(BaseModel):
 
 
 class Diagram:
-    def __init__(self, model: Model):
-        self._m = model
+    """Excalidraw diagram.
+
+    The contents are kept as plain lists and dicts, ready to be written as JSON.
+    The pydantic `Model` is only used if validation is requested.
+    """
+
+    def __init__(
+        self,
+        elements: List[Dict],
+        files: Dict[str, Dict],
+        app_state: Optional[Dict] = None,
+        validate: bool = False,
+    ):
+        self._elements = elements
+        self._files = files
+        self._app_state = dict(_DEFAULT_APP_STATE) if app_state is None else app_state
+        if validate:
+            Model(**self.as_dict())  # raises pydantic.ValidationError
+
+    def as_dict(self) -> Dict:
+        "Diagram contents in the Excalidraw file format"
+        return {
+            "type": "excalidraw",
+            "version": 2,
+            "source": "idaes",
+            "elements": self._elements,
+            "appState": self._app_state,
+            "files": self._files,
+        }
 
     def write(self, outfile: IOBase, **dump_kw):
-        data = self._m.model_dump()
-        json.dump(data, outfile, **dump_kw)
+        """Write diagram as Excalidraw JSON.
+
+        If `orjson` is installed and no keywords are given, the output is compact
+        and written one element (and file) at a time. Otherwise, or to get
+        options such as `indent`, the output is written with `json.dump`.
+
+        Args:
+            outfile: Output stream, text or binary
+            dump_kw: Keywords for `json.dump`
+        """
+        is_binary = _is_binary_output(outfile)
+        if orjson is None or dump_kw:
+            if is_binary:
+                outfile.write(json.dumps(self.as_dict(), **dump_kw).encode("utf-8"))
+            else:
+                json.dump(self.as_dict(), outfile, **dump_kw)
+            return
+        if is_binary:
+            write = outfile.write
+        else:
+
+            def write(b: bytes):
+                outfile.write(b.decode("utf-8"))
+
+        dumps = orjson.dumps
+        data = self.as_dict()
+        elements, files = data.pop("elements"), data.pop("files")
+        app_state = data.pop("appState")
+        # header (everything but the closing brace) and elements
+        write(dumps(data)[:-1] + b',"elements":[')
+        for i, element in enumerate(elements):
+            if i > 0:
+                write(b",")
+            write(dumps(element))
+        write(b'],"appState":' + dumps(app_state) + b',"files":{')
+        for i, (file_id, file_data) in enumerate(files.items()):
+            if i > 0:
+                write(b",")
+            write(dumps(file_id) + b":" + dumps(file_data))
+        write(b"}}")
 
     @classmethod
     def from_svg(cls, infile: IOBase) -> Diagram:
-        tree = ET.parse(infile)
-        root = tree.getroot()
-        svg_ns = "{http://www.w3.org/2000/svg}"
-        svg = root.find(svg_ns + "svg")
-        if svg is None:
+        # First pass: stream the document, reading each top-level <g> of the
+        # inner <svg> into a record as soon as it is complete and then
+        # discarding it.
+        shapes, edges = [], []
+        # Depth of the current element: 0 = root, 1 = inner svg, 2 = groups
+        depth, svg_depth, found_svg = -1, None, False
+        # local aliases for names used on every iteration
+        svg_tag, g_tag = _SVG_TAG, _G_TAG
+        read_group = cls._read_group
+        add_shape, add_edge = shapes.append, edges.append
+        if _HAVE_LXML:
+            # allow large embedded images, and never fetch external entities
+            parse_kw = {"huge_tree": True, "resolve_entities": False}
+        else:
+            parse_kw = {}
+        events = ET.iterparse(
+            _binary_input(infile), events=("start", "end"), **parse_kw
+        )
+        for event, elem in events:
+            if event == "start":
+                depth += 1
+                if depth == 1 and not found_svg and elem.tag == svg_tag:
+                    svg_depth, found_svg = depth, True
+                continue
+            if depth == svg_depth:
+                svg_depth = None  # end of inner svg
+            elif svg_depth is not None and depth == svg_depth + 1:
+                if elem.tag == g_tag:
+                    record = read_group(elem)
+                    if isinstance(record, EdgeRecord):
+                        add_edge(record)
+                    elif record is not None:
+                        add_shape(record)
+                    elem.clear()
+                # drop already-processed siblings (lxml only)
+                if _HAVE_LXML:
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+            depth -= 1
+        if not found_svg:
             raise ValueError("Cannot find <svg> tag")
+        # Second pass: create the elements
+        elements, files = cls._build_elements(shapes, edges)
+        if _log.isEnabledFor(logging.DEBUG):
+            _log.debug("created %d elements", len(elements))
+            count = sum(1 for e in elements if e["type"] == "image")
+            _log.debug("image elements: %d", count)
+        return Diagram(elements, files)
 
-        model = Model(
-            type="excalidraw",
-            version=2,
-            source="idaes",
-            elements=[],
-            appState={
-                "gridSize": 20,
-                "gridStep": 5,
-                "gridModeEnabled": False,
-                "viewBackgroundColor": "#ffffff",
-            },
-            files={},
-        )
-        svg_xc_map = {}
-        shape_bounds = {}
-        shape_elt_map = {}
-        Bounds = namedtuple("Bounds", "x y width height")
-        # Main loop
-        for item in svg:
-            # <g id="Unit_B">
-            # <g class="shape" >
-            # <rect x="286.000000" y="120.000000" width="132.000000"
-            # height="66.000000" stroke="#0D32B2" fill="#F7F8FE"
-            # class=" stroke-B1 fill-B6" style="stroke-width:2;" />
-            # OR
-            # <image href="data:image/svg+xml;base64,PD..."
-            # x="228.000000" y="166.000000" width="128.000000" height="128.000000" stroke="#0D32B2"
-            # fill="#FFFFFF" class=" stroke-B1 fill-N7" style="stroke-width:2;" />
-            # </g>
-            # <text x="352.000000" y="158.500000" fill="#0A0F25" class="text-bold fill-N1"
-            # style="text-anchor:middle;font-size:16px">leach_mixer</text></g>
-            g_tag = svg_ns + "g"
-            if item.tag == g_tag:
-                item_id = item.get("id")
-                xc_id = cls._element_id()
-                svg_xc_map[item_id] = xc_id
-                # Find node and text
-                g_rect, g_line, g_text, g_image = None, None, None, None
-                for subitem in item:
-                    if subitem.tag == g_tag and subitem.get("class", "") == "shape":
-                        for elt in subitem:
-                            if elt.tag == svg_ns + "rect":
-                                g_rect = elt
-                                break
-                            if elt.tag == svg_ns + "image":
-                                g_image = elt
-                                break
-                        if g_rect is None and g_image is None:
-                            raise ValueError(
-                                "shape element did not contain <rect> or <image>"
-                            )
-                    elif subitem.tag == svg_ns + "text":
-                        g_text = subitem
-                    elif subitem.tag == svg_ns + "path":
-                        g_line = subitem
-                rect_elt, text_elt, line_elt, image_elt = None, None, None, None
-                now = int(time.time())
-                if g_rect is not None:
-                    rect_id = xc_id
-                    bounds = Bounds(
-                        *[
-                            int(float(g_rect.get(c)))
-                            for c in ("x", "y", "width", "height")
-                        ]
-                    )
-                    rect_elt = {
-                        "id": rect_id,
-                        "type": "rectangle",
-                        "x": bounds.x,
-                        "y": bounds.y,
-                        "width": bounds.width,
-                        "height": bounds.height,
-                        "angle": 0,
-                        "strokeColor": "#000000",
-                        "backgroundColor": "transparent",
-                        "fillStyle": "solid",
-                        "strokeWidth": 2,
-                        "strokeStyle": "solid",
-                        "roughness": 1,
-                        "opacity": 100,
-                        "roundness": {"type": 3},
-                        "isDeleted": False,
-                        "updated": now,
-                        "locked": False,
-                        "points": [],
-                        "originalText": None,
-                        "autoResize": True,
-                        "lineHeight": 1.25,
-                        "groupIds": [],
-                        "frameId": None,
-                        "link": None,
-                        "boundElements": [],
-                    }
-                    shape_bounds[rect_id] = bounds
-                    shape_elt_map[rect_id] = rect_elt
-                if g_image is not None:
-                    image_id = xc_id
-                    bounds = Bounds(
-                        *[
-                            int(float(g_image.get(c)))
-                            for c in ("x", "y", "width", "height")
-                        ]
-                    )
-                    image_data = g_image.get("href")
-                    image_file_id = cls._image_id(image_data)
-                    image_file_elt = {
-                        "mimeType": "image/svg+xml",
-                        "id": image_file_id,
-                        "dataURL": image_data,
-                        "created": now,
-                        "lastRetrieved": now,
-                    }
-                    image_elt = {
-                        "id": image_id,
-                        "type": "image",
-                        "x": bounds.x,
-                        "y": bounds.y,
-                        "width": bounds.width,
-                        "height": bounds.height,
-                        "angle": 0,
-                        "strokeColor": "#000000",
-                        "backgroundColor": "transparent",
-                        "fillStyle": "solid",
-                        "strokeWidth": 2,
-                        "strokeStyle": "solid",
-                        "roughness": 1,
-                        "opacity": 100,
-                        "roundness": None,
-                        "isDeleted": False,
-                        "updated": now,
-                        "locked": False,
-                        "points": [],
-                        "originalText": None,
-                        "autoResize": True,
-                        "lineHeight": 1.25,
-                        "groupIds": [],
-                        "frameId": None,
-                        "link": None,
-                        "boundElements": [],
-                        "scale": [1, 1],
-                        "crop": None,
-                        "fileId": image_file_id,
-                    }
-                    shape_bounds[image_id] = bounds
-                    shape_elt_map[image_id] = image_elt
-                if g_text is not None:
-                    # <text x="352.000000" y="158.500000" fill="#0A0F25"
-                    # class="text-bold fill-N1"
-                    # style="text-anchor:middle;font-size:16px">leach_mixer</text>
-                    text_id = cls._element_id()
-                    tb = Bounds(
-                        *[int(float(g_text.get(c))) for c in ("x", "y")] + [0, 0]
+    @classmethod
+    def _read_group(cls, item) -> Union[ShapeRecord, EdgeRecord, None]:
+        """Read the data needed from one top-level SVG group.
+
+        A group is either a shape (rect or image, with optional text) or a line
+        between two shapes, which is any group with a <path>.
+
+        Returns:
+            Record for the group, or None if it has nothing to draw
+        """
+        # <g id="Unit_B">
+        # <g class="shape" >
+        # <rect x="286.000000" y="120.000000" width="132.000000"
+        # height="66.000000" stroke="#0D32B2" fill="#F7F8FE"
+        # class=" stroke-B1 fill-B6" style="stroke-width:2;" />
+        # OR
+        # <image href="data:image/svg+xml;base64,PD..."
+        # x="228.000000" y="166.000000" width="128.000000" height="128.000000" stroke="#0D32B2"
+        # fill="#FFFFFF" class=" stroke-B1 fill-N7" style="stroke-width:2;" />
+        # </g>
+        # <text x="352.000000" y="158.500000" fill="#0A0F25" class="text-bold fill-N1"
+        # style="text-anchor:middle;font-size:16px">leach_mixer</text></g>
+        # local aliases for names used in the loops below
+        g_tag = _G_TAG
+        part_of, shape_kind_of = _GROUP_PARTS.get, _SHAPE_KINDS.get
+        item_id = item.attrib.get("id")
+        # Find node, text, and line
+        g_shape, shape_kind = None, None
+        parts = [None, None]  # text and line, at their `_GROUP_PARTS` index
+        for subitem in item:
+            tag = subitem.tag
+            part = part_of(tag)
+            if part is not None:
+                parts[part] = subitem
+            elif tag == g_tag and subitem.get("class", "") == "shape":
+                for elt in subitem:
+                    kind = shape_kind_of(elt.tag)
+                    if kind is not None:
+                        g_shape, shape_kind = elt, kind
+                        break
+                else:
+                    raise ValueError("shape element did not contain <rect> or <image>")
+        g_text, g_line = parts
+        text = None
+        if g_text is not None:
+            # <text x="352.000000" y="158.500000" fill="#0A0F25"
+            # class="text-bold fill-N1"
+            # style="text-anchor:middle;font-size:16px">leach_mixer</text>
+            attrib = g_text.attrib
+            # get font size
+            match = _FONT_SIZE_RE.search(attrib.get("style", ""))
+            if match:
+                font_size = int(match.group(1))
+            else:
+                font_size = 12
+            text = TextRecord(
+                g_text.text.strip(),
+                int(float(attrib["x"])),
+                int(float(attrib["y"])),
+                font_size,
+            )
+        if g_line is not None:
+            # <g id="(Unit_B -&gt; Unit_C)[0]">...</g>
+            # <path d="M 610.414213 155.085786 C 654.599976 110.900002 678.200012 110.900002 724.077373 153.769020"
+            # extract start/end rect id
+            match = _EDGE_ID_RE.search(item_id)
+            if match is None:
+                raise ValueError(f"could not find line endpoints in id '{item_id}'")
+            path_coords = g_line.get("d", None)
+            if path_coords is None:
+                coords = None
+            else:
+                coord_items = path_coords.replace(",", " ").split()
+                if len(coord_items) < 10:
+                    raise ValueError(
+                        f"Wrong number of items (got {len(coord_items)}, expected 10 or more) "
+                        f"for cubic path: {coord_items}"
                     )
-                    text_value = g_text.text.strip()
-                    # get font size
-                    text_style = g_text.get("style", "")
-                    match = re.search(r"font-size:\s*(\d+)px", text_style)
-                    if match:
-                        font_size = int(match.group(1))
-                    else:
-                        font_size = 12
-                    # calculate SVG margin from text to rectangle
-                    margin = 4  # (tb.x - rb.x) // 2
-                    # create element
-                    text_elt = {
-                        "id": text_id,
-                        "type": "text",
-                        "x": bounds.x,
-                        # center vertically
-                        "y": bounds.y + (bounds.height / 2) - margin - (font_size / 2),
-                        "width": bounds.width + font_size,  # padding
-                        "height": font_size * 1.5,
-                        "angle": 0,
-                        "strokeColor": "#000000",
-                        "backgroundColor": "transparent",
-                        "fillStyle": "solid",
-                        "strokeWidth": 2,
-                        "strokeStyle": "solid",
-                        "roughness": 1,
-                        "opacity": 100,
-                        "groupIds": [],
-                        "frameId": None,
-                        "roundness": None,
-                        "isDeleted": False,
-                        "boundElements": None,
-                        "updated": now,
-                        "link": None,
-                        "locked": False,
-                        "text": text_value,
-                        "fontSize": font_size,
-                        "fontFamily": 6,
-                        "textAlign": "center",
-                        "verticalAlign": "middle",
-                        "containerId": None,
-                        "originalText": text_value,
-                        "autoResize": True,
-                        "lineHeight": 1,
-                    }
-                if g_line is not None:
-                    # <g id="(Unit_B -&gt; Unit_C)[0]">...</g>
-                    # <path d="M 610.414213 155.085786 C 654.599976 110.900002 678.200012 110.900002 724.077373 153.769020"
-                    # svg_xc_map[item_id] = xc_id
-                    line_id = cls._element_id()
-                    # extract start/end rect id
-                    match = re.search(r"\((\S+)\s*->\s*(\S+)\).*", item_id)
-                    if match is None:
-                        raise ValueError(
-                            f"could not find line endpoints in id '{item_id}'"
-                        )
-                    unit = match.group(1)
-                    start_shape_id = svg_xc_map[unit]
-                    unit = match.group(2)
-                    end_shape_id = svg_xc_map[unit]
-                    path_coords = g_line.get("d", None)
-                    if path_coords is None:
-                        # in absence of a path, just connect with straight line
-                        start_bounds = shape_bounds[start_shape_id]
-                        end_bounds = shape_bounds[end_shape_id]
-                        # extract line points
-                        dx = end_bounds.x - start_bounds.x
-                        startx = start_bounds.width if dx > 0 else 0
-                        dy = end_bounds.y - start_bounds.y
-                        starty = start_bounds.height / 2
-                        point_list = [[startx, starty], [dx, dy]]
-                    else:
-                        coord_items = re.split(r"[, ]+", path_coords)
-                        if len(coord_items) < 10:
-                            raise ValueError(
-                                f"Wrong number of items (got {len(coord_items)}, expected 10 or more) "
-                                f"for cubic path: {coord_items}"
-                            )
-                        if coord_items[0] != "M":
-                            raise ValueError(
-                                f"Expected 'M' as first item in path: {coord_items}"
-                            )
-                        if coord_items[3] != "C":
-                            raise ValueError(
-                                f"Expected 'C' as third item in path: {coord_items}"
-                            )
-                        # get start/end positions from path (ignore width/height)
-                        start_bounds = Bounds(
-                            float(coord_items[1]), float(coord_items[2]), 0, 0
-                        )
-                        end_bounds = Bounds(
-                            float(coord_items[8]), float(coord_items[9]), 0, 0
-                        )
-                        # put path in point list
-                        point_list = [[0, 0]]
-                        # for xi, yi in ((4, 5), (-4, -3), (-2, -1)):
-                        for xi, yi in ((4, 5), (-2, -1)):
-                            x, y = float(coord_items[xi]), float(coord_items[yi])
-                            point_list.append([x - start_bounds.x, y - start_bounds.y])
-                        _log.debug(f"Line points: {point_list}")
-                    # build element
-                    line_elt = {
-                        "id": line_id,
-                        "type": "arrow",
-                        "x": start_bounds.x,
-                        "y": start_bounds.y,
-                        "width": abs(end_bounds.x - start_bounds.x),
-                        "height": abs(end_bounds.y - start_bounds.y),
-                        "angle": 0,
-                        "strokeColor": "#1e1e1e",
-                        "backgroundColor": "transparent",
-                        "fillStyle": "solid",
-                        "strokeWidth": 2,
-                        "strokeStyle": "solid",
-                        "roughness": 1,
-                        "opacity": 100,
-                        "groupIds": [],
-                        "frameId": None,
-                        "roundness": {"type": 2},
-                        "isDeleted": False,
-                        "boundElements": None,
-                        "updated": now,
-                        "link": None,
-                        "locked": False,
-                        "points": point_list,
-                        "lastCommittedPoint": None,
-                        "startBinding": {
-                            "elementId": start_shape_id,
-                            "focus": 0,
-                            "gap": 1,
-                            "fixedPoint": None,
-                        },
-                        "endBinding": {
-                            "elementId": end_shape_id,
-                            "focus": 0,
-                            "gap": 1,
-                            "fixedPoint": None,
-                        },
-                        "startArrowhead": None,
-                        "endArrowhead": "arrow",
-                        "elbowed": False,
-                    }
-                    # assume all shapes go first
-                    shape_elt_map[start_shape_id]["boundElements"].append(
-                        {"type": "arrow", "id": line_id}
+                if coord_items[0] != "M":
+                    raise ValueError(
+                        f"Expected 'M' as first item in path: {coord_items}"
                     )
-                    shape_elt_map[end_shape_id]["boundElements"].append(
-                        {"type": "arrow", "id": line_id}
+                if coord_items[3] != "C":
+                    raise ValueError(
+                        f"Expected 'C' as third item in path: {coord_items}"
                     )
-                if text_elt and rect_elt:
-                    rect_elt["boundElements"].append({"type": "text", "id": text_id})
-                    text_elt["containerId"] = rect_id
-                elif text_elt and image_elt:
-                    group_id = cls._element_id()
-                    image_elt["groupIds"] = [group_id]
-                    text_elt["groupIds"] = [group_id]
-                    # move text below image
-                    text_elt["y"] += image_elt["height"] / 2 + font_size / 2
-                if rect_elt:
-                    model.elements.append(rect_elt)
-                if image_elt:
-                    model.elements.append(image_elt)
-                    model.files[image_file_id] = image_file_elt
-                if text_elt:
-                    model.elements.append(text_elt)
-                if line_elt:
-                    model.elements.append(line_elt)
-        _log.debug(f"created {len(model.elements)} elements")
-        if _log.isEnabledFor(logging.DEBUG):
-            count = 0
-            for e in model.elements:
-                if e["type"] == "image":
-                    count += 1
-            _log.debug(f"image elements: {count}")
-        return Diagram(model)
+                coords = [coord_items[i] for i in _PATH_COORD_INDEXES]
+            return EdgeRecord(item_id, match.group(1), match.group(2), coords, text)
+        if g_shape is None:
+            if text is None:
+                return None
+            # no shape in this group, so position by the text
+            return ShapeRecord(item_id, None, text.x, text.y, 0, 0, None, text)
+        attrib = g_shape.attrib
+        return ShapeRecord(
+            item_id,
+            shape_kind,
+            int(float(attrib["x"])),
+            int(float(attrib["y"])),
+            int(float(attrib["width"])),
+            int(float(attrib["height"])),
+            attrib["href"] if shape_kind == "image" else None,
+            text,
+        )
+
+    @classmethod
+    def _build_elements(
+        cls, shapes: List[ShapeRecord], edges: List[EdgeRecord]
+    ) -> Tuple[List[Dict], Dict[str, Dict]]:
+        """Create the Excalidraw elements and files for the shapes and edges.
+
+        Returns:
+            Tuple of the list of elements and the files (keyed by file id)
+        """
+        elements, files = [], {}
+        # creation time for all elements and files
+        now = int(time.time())
+        gen_id = cls._element_id
+        # Shapes, with their text
+        shape_index = {}  # SVG group id -> index in `shapes`
+        shape_elts = []  # element for each shape
+        # elements bound to each shape, added to the shape elements at the end
+        bound_elements = [[] for _ in shapes]
+        add_rect, add_image = cls._add_rect_shape, cls._add_image_shape
+        # file id for each image data URL, so a reused image is hashed once
+        file_ids = {}
+        for i, shape in enumerate(shapes):
+            # rectangles are by far the most common, and the simplest
+            if shape.kind == "rectangle":
+                shape_elt = add_rect(shape, now, elements, bound_elements[i])
+            elif shape.kind == "image":
+                shape_elt = add_image(shape, now, elements, files, file_ids)
+            else:
+                shape_elt = None
+                bounds = (shape.x, shape.y, shape.width, shape.height)
+                elements.append(cls._text_element(shape.text, bounds, gen_id(), now))
+            shape_elts.append(shape_elt)
+            if shape_elt is not None:
+                shape_index[shape.id] = i
+        # Geometry of all the edges, computed together. Edges without a path
+        # are connected with a straight line between the shapes' bounds.
+        start_idx = np.array([shape_index[e.start] for e in edges], dtype=np.intp)
+        end_idx = np.array([shape_index[e.end] for e in edges], dtype=np.intp)
+        has_path = np.array([e.coords is not None for e in edges], dtype=bool)
+        pts = np.array(
+            [c for e in edges if e.coords is not None for c in e.coords],
+            dtype=np.float64,
+        ).reshape(-1, 4, 2)
+        path_x, path_y, path_width, path_height, path_rel = _edge_geom(pts)
+        path_geom = zip(
+            path_x.tolist(),
+            path_y.tolist(),
+            path_width.tolist(),
+            path_height.tolist(),
+            path_rel.tolist(),
+        )
+        # bounds of the shapes as columns x, y, width, height
+        bounds = np.array(
+            [(s.x, s.y, s.width, s.height) for s in shapes], dtype=np.int64
+        ).reshape(-1, 4)
+        start_bounds = bounds[start_idx[~has_path]]
+        end_bounds = bounds[end_idx[~has_path]]
+        dx = end_bounds[:, 0] - start_bounds[:, 0]
+        dy = end_bounds[:, 1] - start_bounds[:, 1]
+        line_geom = zip(
+            start_bounds[:, 0].tolist(),
+            start_bounds[:, 1].tolist(),
+            np.abs(dx).tolist(),
+            np.abs(dy).tolist(),
+            np.where(dx > 0, start_bounds[:, 2], 0).tolist(),
+            (start_bounds[:, 3] / 2).tolist(),
+            dx.tolist(),
+            dy.tolist(),
+        )
+        # Edges, with their labels
+        debug = _log.isEnabledFor(logging.DEBUG)
+        for edge, start, end in zip(edges, start_idx.tolist(), end_idx.tolist()):
+            if edge.coords is None:
+                # in absence of a path, just connect with straight line
+                x, y, width, height, startx, starty, dx, dy = next(line_geom)
+                point_list = [[startx, starty], [dx, dy]]
+            else:
+                x, y, width, height, rel = next(path_geom)
+                # put path in point list, relative to the start
+                point_list = [[0, 0]] + rel
+                if debug:
+                    _log.debug("Line points: %r", point_list)
+            if edge.text is not None:
+                bounds = (edge.text.x, edge.text.y, 0, 0)
+                elements.append(cls._text_element(edge.text, bounds, gen_id(), now))
+            start_elt, end_elt = shape_elts[start], shape_elts[end]
+            line_id = gen_id()
+            line_elt = _ARROW_TEMPLATE.copy()
+            line_elt.update(
+                id=line_id,
+                x=x,
+                y=y,
+                width=width,
+                height=height,
+                groupIds=[],
+                roundness={"type": 2},
+                updated=now,
+                points=point_list,
+                startBinding={
+                    "elementId": start_elt["id"],
+                    "focus": 0,
+                    "gap": 1,
+                    "fixedPoint": None,
+                },
+                endBinding={
+                    "elementId": end_elt["id"],
+                    "focus": 0,
+                    "gap": 1,
+                    "fixedPoint": None,
+                },
+            )
+            bound_elements[start].append({"type": "arrow", "id": line_id})
+            bound_elements[end].append({"type": "arrow", "id": line_id})
+            elements.append(line_elt)
+        for shape_elt, bound in zip(shape_elts, bound_elements):
+            if shape_elt is not None:
+                shape_elt["boundElements"] = bound
+        return elements, files
+
+    @classmethod
+    def _add_rect_shape(
+        cls, shape: ShapeRecord, now: int, elements: List[Dict], bound: List[Dict]
+    ) -> Dict:
+        """Add elements for a rectangle and its text (if any).
+
+        Args:
+            shape: Rectangle to add
+            now: Time of creation
+            elements: Elements list, modified
+            bound: Elements bound to the rectangle, modified
+
+        Returns:
+            Rectangle element
+        """
+        rect_elt = _RECT_TEMPLATE.copy()
+        rect_elt.update(
+            id=cls._element_id(),
+            x=shape.x,
+            y=shape.y,
+            width=shape.width,
+            height=shape.height,
+            roundness={"type": 3},
+            updated=now,
+            points=[],
+            groupIds=[],
+        )
+        elements.append(rect_elt)
+        if shape.text is not None:
+            bounds = (shape.x, shape.y, shape.width, shape.height)
+            text_elt = cls._text_element(shape.text, bounds, cls._element_id(), now)
+            bound.append({"type": "text", "id": text_elt["id"]})
+            text_elt["containerId"] = rect_elt["id"]
+            elements.append(text_elt)
+        return rect_elt
+
+    @classmethod
+    def _add_image_shape(
+        cls,
+        shape: ShapeRecord,
+        now: int,
+        elements: List[Dict],
+        files: Dict[str, Dict],
+        file_ids: Dict[str, str],
+    ) -> Dict:
+        """Add elements for an image, its file, and its text (if any).
+
+        Args:
+            shape: Image to add
+            now: Time of creation
+            elements: Elements list, modified
+            files: Files for images, keyed by file id, modified
+            file_ids: File id for each image data URL already seen, modified
+
+        Returns:
+            Image element
+        """
+        image_file_id = file_ids.get(shape.href)
+        if image_file_id is None:
+            image_file_id = file_ids[shape.href] = cls._image_id(shape.href)
+            files[image_file_id] = {
+                "mimeType": "image/svg+xml",
+                "id": image_file_id,
+                "dataURL": shape.href,
+                "created": now,
+                "lastRetrieved": now,
+            }
+        image_elt = _IMAGE_TEMPLATE.copy()
+        image_elt.update(
+            id=cls._element_id(),
+            x=shape.x,
+            y=shape.y,
+            width=shape.width,
+            height=shape.height,
+            updated=now,
+            points=[],
+            groupIds=[],
+            scale=[1, 1],
+            fileId=image_file_id,
+        )
+        elements.append(image_elt)
+        if shape.text is not None:
+            bounds = (shape.x, shape.y, shape.width, shape.height)
+            text_elt = cls._text_element(shape.text, bounds, cls._element_id(), now)
+            group_id = cls._element_id()
+            image_elt["groupIds"] = [group_id]
+            text_elt["groupIds"] = [group_id]
+            # move text below image
+            text_elt["y"] += shape.height / 2 + shape.text.font_size / 2
+            elements.append(text_elt)
+        return image_elt
+
+    @staticmethod
+    def _text_element(
+        text: TextRecord, bounds: Tuple[int, int, int, int], text_id: str, now: int
+    ) -> Dict:
+        """Create a text element centered vertically in the given bounds.
+
+        Args:
+            text: Text to show
+            bounds: Tuple of x, y, width, and height of the containing shape
+            text_id: Element identifier
+            now: Time of creation
+        """
+        # calculate SVG margin from text to rectangle
+        margin = 4
+        font_size = text.font_size
+        x, y, width, height = bounds
+        text_elt = _TEXT_TEMPLATE.copy()
+        text_elt.update(
+            id=text_id,
+            x=x,
+            # center vertically
+            y=y + (height / 2) - margin - (font_size / 2),
+            width=width + font_size,  # padding
+            height=font_size * 1.5,
+            groupIds=[],
+            updated=now,
+            text=text.value,
+            fontSize=font_size,
+            originalText=text.value,
+        )
+        return text_elt
 
     # Alphabet for Excalidraw identifiers
     IDCHARS = (
@@ -405,16 +725,24 @@ class Diagram:
         + [chr(ord("a") + i) for i in range(26)]
         + [chr(ord("0") + i) for i in range(10)]
     )
+    # Table for `bytes.translate` mapping each byte value onto the alphabet.
+    # Values past the last whole multiple of the alphabet size are deleted
+    # instead, so all characters are equally likely.
+    _ID_TABLE = ("".join(IDCHARS) * 5)[:256].encode("ascii")
+    _ID_DELETE = bytes(range(256 - 256 % len(IDCHARS), 256))
 
     @classmethod
     def _element_id(cls) -> str:
         "Generate random identifier in the style used by Excalidraw"
-        items = random.choices(cls.IDCHARS, k=21)
-        return "".join(items)
+        # 32 random bytes almost always leave at least 21 after deletions
+        id_bytes = b""
+        while len(id_bytes) < 21:
+            id_bytes += os.urandom(32).translate(cls._ID_TABLE, cls._ID_DELETE)
+        return id_bytes[:21].decode("ascii")
 
-    @classmethod
-    def _image_id(cls, data: str) -> str:
-        "Generate random identifier for Excalidraw image"
+    @staticmethod
+    def _image_id(data: str) -> str:
+        "Generate identifier for Excalidraw image from its (data URL) contents"
         return sha1(data.encode("utf-8")).hexdigest()
 
 
@@ -422,6 +750,12 @@ def main() -> int:
     p = argparse.ArgumentParser()
     p.add_argument("infile", metavar="input-file")
     p.add_argument("outfile", metavar="output-file")
+    p.add_argument(
+        "--indent",
+        type=int,
+        default=None,
+        help="Indent the output JSON by this many spaces (default: compact output)",
+    )
     args = p.parse_args()
 
     # set up logging
@@ -432,12 +766,13 @@ def main() -> int:
 
     # read and parse input
     _log.info(f"reading SVG from input file '{args.infile}'")
-    with open(args.infile) as infile:
+    with open(args.infile, "rb") as infile:
         diagram = Diagram.from_svg(infile)
 
     # write output
-    with open(args.outfile, "w") as outfile:
-        diagram.write(outfile, indent=2)
+    dump_kw = {} if args.indent is None else {"indent": args.indent}
+    with open(args.outfile, "wb") as outfile:
+        diagram.write(outfile, **dump_kw)
     _log.info(f"wrote JSON to output file '{args.outfile}'")
 
     return 0
@@ -0,0 +1,311 @@
+###############################################################################
+# PrOMMiS was produced under the DOE Process Optimization and Modeling
+# for Minerals Sustainability (“PrOMMiS”) initiative, and is
+# Copyright © 2024-2025 by the software owners: The Regents of the
+# University of California, through Lawrence Berkeley National
+# Laboratory, National Technology & Engineering Solutions of Sandia, LLC,
+# Carnegie Mellon University, West Virginia University Research
+# Corporation, University of Notre Dame, and Georgia Institute of
+# Technology. All rights reserved.
+###############################################################################
+"""
+Tests for `excalidraw_model` module.
+"""
+# stdlib
+from collections import Counter
+from hashlib import sha1
+from io import BytesIO, StringIO
+import json
+import sys
+import tempfile
+import xml.etree.ElementTree
+
+# third-party
+import pytest
+
+# package
+from idaes_connectivity import excalidraw_model
+from idaes_connectivity.excalidraw_model import Diagram
+
+IMAGE_HREF = "data:image/svg+xml;base64,PHN2Zz48L3N2Zz4="
+
+SHAPE_A = (
+    '<g id="A"><g class="shape">'
+    '<rect x="10.000000" y="20.000000" width="100.000000" height="50.000000" />'
+    "</g>"
+    '<text x="60.000000" y="45.500000" style="text-anchor:middle;font-size:16px">'
+    "unit A</text></g>"
+)
+SHAPE_B = (
+    '<g id="B"><g class="shape">'
+    f'<image href="{IMAGE_HREF}" x="200.000000" y="20.000000"'
+    ' width="64.000000" height="64.000000" />'
+    "</g>"
+    '<text x="232.000000" y="100.000000" style="font-size:14px">unit B</text></g>'
+)
+EDGE_AB = (
+    '<g id="(A -&gt; B)[0]">'
+    '<path d="M 110.000000 45.000000 C 150.000000,30.000000 160.000000 30.000000 '
+    '200.000000 52.000000" /></g>'
+)
+# no path coordinates, so drawn as a straight line
+EDGE_BA = '<g id="(B -&gt; A)[0]"><path /></g>'
+
+
+def svg_input(*groups: str) -> BytesIO:
+    """Wrap groups in D2-style nested <svg> elements."""
+    body = "".join(groups)
+    text = (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<svg xmlns="http://www.w3.org/2000/svg" width="400" height="200">'
+        '<svg class="d2" width="400" height="200">'
+        '<rect x="0" y="0" width="400" height="200" fill="#FFFFFF" />'
+        f"{body}</svg></svg>"
+    )
+    return BytesIO(text.encode("utf-8"))
+
+
+@pytest.fixture(params=["lxml", "stdlib"])
+def parser(request, monkeypatch):
+    """Run with each XML parser backend."""
+    if request.param == "lxml":
+        if not excalidraw_model._HAVE_LXML:
+            pytest.skip("lxml is not installed")
+    else:
+        monkeypatch.setattr(excalidraw_model, "ET", xml.etree.ElementTree)
+        monkeypatch.setattr(excalidraw_model, "_HAVE_LXML", False)
+    return request.param
+
+
+def elements_of(diagram: Diagram):
+    return diagram.as_dict()["elements"]
+
+
+@pytest.mark.unit
+def test_from_svg(parser):
+    data = Diagram.from_svg(svg_input(SHAPE_A, SHAPE_B, EDGE_AB, EDGE_BA)).as_dict()
+    elts = data["elements"]
+    assert [e["type"] for e in elts] == [
+        "rectangle",
+        "text",
+        "image",
+        "text",
+        "arrow",
+        "arrow",
+    ]
+    rect, rect_text, image, image_text, arrow_ab, arrow_ba = elts
+    # rectangle with text inside
+    assert (rect["x"], rect["y"], rect["width"], rect["height"]) == (10, 20, 100, 50)
+    assert rect_text["text"] == "unit A"
+    assert rect_text["fontSize"] == 16
+    assert rect_text["containerId"] == rect["id"]
+    assert rect_text["y"] == 20 + 50 / 2 - 4 - 16 / 2
+    assert rect["boundElements"] == [
+        {"type": "text", "id": rect_text["id"]},
+        {"type": "arrow", "id": arrow_ab["id"]},
+        {"type": "arrow", "id": arrow_ba["id"]},
+    ]
+    # image grouped with text below it
+    file_id = sha1(IMAGE_HREF.encode("utf-8")).hexdigest()
+    assert image["fileId"] == file_id
+    assert list(data["files"]) == [file_id]
+    assert data["files"][file_id]["dataURL"] == IMAGE_HREF
+    assert image_text["containerId"] is None
+    assert len(image["groupIds"]) == 1
+    assert image_text["groupIds"] == image["groupIds"]
+    assert image_text["y"] == (20 + 64 / 2 - 4 - 14 / 2) + 64 / 2 + 14 / 2
+    assert image["boundElements"] == [
+        {"type": "arrow", "id": arrow_ab["id"]},
+        {"type": "arrow", "id": arrow_ba["id"]},
+    ]
+    # curved arrow, from the path
+    assert arrow_ab["startBinding"]["elementId"] == rect["id"]
+    assert arrow_ab["endBinding"]["elementId"] == image["id"]
+    assert (arrow_ab["x"], arrow_ab["y"]) == (110, 45)
+    assert (arrow_ab["width"], arrow_ab["height"]) == (90, 7)
+    assert arrow_ab["points"] == [[0, 0], [40, -15], [90, 7]]
+    # straight arrow, from the shape bounds
+    assert arrow_ba["startBinding"]["elementId"] == image["id"]
+    assert arrow_ba["endBinding"]["elementId"] == rect["id"]
+    assert (arrow_ba["x"], arrow_ba["y"]) == (200, 20)
+    assert (arrow_ba["width"], arrow_ba["height"]) == (190, 0)
+    assert arrow_ba["points"] == [[0, 32], [-190, 0]]
+    # every element has its own id
+    assert len({e["id"] for e in elts}) == len(elts)
+
+
+@pytest.mark.unit
+def test_from_svg_text_input(parser):
+    text = svg_input(SHAPE_A, SHAPE_B, EDGE_AB).getvalue().decode("utf-8")
+    elts = elements_of(Diagram.from_svg(StringIO(text)))
+    assert [e["type"] for e in elts] == ["rectangle", "text", "image", "text", "arrow"]
+
+
+@pytest.mark.unit
+def test_edge_before_shapes(parser):
+    elts = elements_of(Diagram.from_svg(svg_input(EDGE_AB, SHAPE_A, SHAPE_B)))
+    assert [e["type"] for e in elts] == ["rectangle", "text", "image", "text", "arrow"]
+    rect, image, arrow = elts[0], elts[2], elts[4]
+    assert arrow["startBinding"]["elementId"] == rect["id"]
+    assert arrow["endBinding"]["elementId"] == image["id"]
+    assert rect["boundElements"][-1] == {"type": "arrow", "id": arrow["id"]}
+    assert image["boundElements"] == [{"type": "arrow", "id": arrow["id"]}]
+
+
+@pytest.mark.unit
+def test_text_only_group(parser):
+    group = '<g id="note"><text x="5.000000" y="7.000000">hello</text></g>'
+    elts = elements_of(Diagram.from_svg(svg_input(group)))
+    assert len(elts) == 1
+    text = elts[0]
+    assert text["type"] == "text"
+    assert text["text"] == "hello"
+    assert text["fontSize"] == 12  # default
+    assert (text["x"], text["y"]) == (5, 7 - 4 - 12 / 2)
+    assert text["containerId"] is None
+
+
+@pytest.mark.unit
+def test_shared_image(parser):
+    shape_c = SHAPE_B.replace('id="B"', 'id="C"').replace("unit B", "unit C")
+    data = Diagram.from_svg(svg_input(SHAPE_B, shape_c)).as_dict()
+    images = [e for e in data["elements"] if e["type"] == "image"]
+    assert len(images) == 2
+    assert images[0]["id"] != images[1]["id"]
+    # one file entry, referenced by both images
+    assert len(data["files"]) == 1
+    assert images[0]["fileId"] == images[1]["fileId"]
+    assert images[0]["fileId"] in data["files"]
+
+
+@pytest.mark.unit
+def test_element_id():
+    idchars = set(Diagram.IDCHARS)
+    assert len(Diagram._ID_TABLE) == 256
+    assert len(Diagram._ID_DELETE) == 256 % len(Diagram.IDCHARS)
+    # bytes that are kept map evenly onto the id characters
+    kept = bytes(sorted(set(range(256)) - set(Diagram._ID_DELETE)))
+    counts = Counter(kept.translate(Diagram._ID_TABLE).decode("ascii"))
+    assert set(counts) == idchars
+    assert len(set(counts.values())) == 1
+    ids = [Diagram._element_id() for _ in range(1000)]
+    for id_ in ids:
+        assert len(id_) == 21
+        assert set(id_) <= idchars
+    assert len(set(ids)) == len(ids)
+
+
+@pytest.mark.unit
+def test_empty(parser):
+    assert elements_of(Diagram.from_svg(svg_input())) == []
+
+
+@pytest.mark.unit
+def test_no_inner_svg(parser):
+    infile = BytesIO(b'<svg xmlns="http://www.w3.org/2000/svg"><g id="A" /></svg>')
+    with pytest.raises(ValueError, match="Cannot find <svg>"):
+        Diagram.from_svg(infile)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "path,message",
+    [
+        ("L 110 45 C 150 30 160 30 200 52", "Expected 'M'"),
+        ("M 110 45 L 150 30 160 30 200 52", "Expected 'C'"),
+        ("M 110 45 C 150 30", "Wrong number of items"),
+    ],
+)
+def test_bad_path(parser, path, message):
+    edge = f'<g id="(A -&gt; B)[0]"><path d="{path}" /></g>'
+    with pytest.raises(ValueError, match=message):
+        Diagram.from_svg(svg_input(SHAPE_A, SHAPE_B, edge))
+
+
+@pytest.mark.unit
+def test_shape_without_rect_or_image(parser):
+    group = '<g id="A"><g class="shape"><circle r="5" /></g></g>'
+    with pytest.raises(ValueError, match="did not contain <rect> or <image>"):
+        Diagram.from_svg(svg_input(group))
+
+
+@pytest.mark.unit
+def test_bad_edge_id(parser):
+    edge = '<g id="A to B"><path d="M 1 2 C 3 4 5 6 7 8" /></g>'
+    with pytest.raises(ValueError, match="could not find line endpoints"):
+        Diagram.from_svg(svg_input(SHAPE_A, SHAPE_B, edge))
+
+
+@pytest.fixture(params=["orjson", "json"])
+def serializer(request, monkeypatch):
+    """Run with and without orjson."""
+    if request.param == "orjson":
+        if excalidraw_model.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(excalidraw_model, "orjson", None)
+    return request.param
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("stream", ["text", "binary"])
+@pytest.mark.parametrize("dump_kw", [{}, {"indent": 2}])
+def test_write(serializer, stream, dump_kw):
+    diagram = Diagram.from_svg(svg_input(SHAPE_A, SHAPE_B, EDGE_AB, EDGE_BA))
+    outfile = StringIO() if stream == "text" else BytesIO()
+    diagram.write(outfile, **dump_kw)
+    assert json.loads(outfile.getvalue()) == diagram.as_dict()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("mode", ["w+", "w+b"])
+def test_write_spooled(serializer, mode):
+    # not a TextIOBase even in text mode, so the mode decides
+    diagram = Diagram.from_svg(svg_input(SHAPE_A, SHAPE_B, EDGE_AB))
+    with tempfile.SpooledTemporaryFile(mode=mode) as outfile:
+        diagram.write(outfile)
+        outfile.seek(0)
+        assert json.loads(outfile.read()) == diagram.as_dict()
+
+
+@pytest.mark.unit
+def test_write_empty(serializer):
+    diagram = Diagram([], {})
+    outfile = BytesIO()
+    diagram.write(outfile)
+    assert json.loads(outfile.getvalue()) == diagram.as_dict()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("indent", [None, 2])
+def test_main(tmp_path, monkeypatch, indent):
+    infile, outfile = tmp_path / "diagram.svg", tmp_path / "diagram.json"
+    infile.write_bytes(svg_input(SHAPE_A, SHAPE_B, EDGE_AB).getvalue())
+    args = [str(infile), str(outfile)]
+    if indent is not None:
+        args = ["--indent", str(indent)] + args
+    monkeypatch.setattr(sys, "argv", ["excalidraw_model"] + args)
+    assert excalidraw_model.main() == 0
+    text = outfile.read_text(encoding="utf-8")
+    # compact output by default, pretty-printed with --indent
+    assert ("\n" in text) == (indent is not None)
+    data = json.loads(text)
+    assert data["type"] == "excalidraw"
+    assert [e["type"] for e in data["elements"]] == [
+        "rectangle",
+        "text",
+        "image",
+        "text",
+        "arrow",
+    ]
+
+
+@pytest.mark.unit
+def test_huge_image(parser):
+    # larger than libxml2's default 10 MB limit for a single attribute value
+    href = "data:image/svg+xml;base64," + "A" * (10 * 1024 * 1024)
+    group = SHAPE_B.replace(IMAGE_HREF, href)
+    data = Diagram.from_svg(svg_input(group)).as_dict()
+    image = data["elements"][0]
+    assert image["type"] == "image"
+    assert data["files"][image["fileId"]]["dataURL"] == href